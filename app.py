@@ -1,15 +1,99 @@
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, Response, render_template, jsonify, request
 from flask_socketio import SocketIO, emit
 import os
+import hmac
 import json
+import math
 import random
+import secrets
+import threading
 import time
+import uuid
 from dataclasses import dataclass, asdict
+from functools import wraps
 from typing import List, Dict
+from checkpoint import (CheckpointError, FileCheckpointStore, FLAG_MIGRATING,
+                        decode_checkpoint, encode_checkpoint, read_header)
+from leaderboard import LeaderboardStore
+from matchmaking import Matchmaker
+from offload import run_blocking
+from profiler import TickProfiler
+from ratelimit import RateLimiter, OverloadGuard
+from transport import TransportGuard, client_options
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-key-123')
-socketio = SocketIO(app)
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')  # 未设置时管理接口不可用
+
+# Socket.IO 传输配置
+#   SOCKETIO_TRANSPORTS           允许的传输方式，设为 websocket 可禁用长轮询
+#   SOCKETIO_WEBSOCKET_DEFLATE    是否协商 websocket 的 permessage-deflate
+#   SOCKETIO_HTTP_COMPRESSION     长轮询响应是否压缩
+#   SOCKETIO_COMPRESSION_THRESHOLD  长轮询响应超过该字节数才压缩
+#   SOCKETIO_PING_INTERVAL / SOCKETIO_PING_TIMEOUT  心跳间隔和超时（秒）
+def env_flag(name, default):
+    return os.environ.get(name, '1' if default else '0').lower() in ('1', 'true', 'yes', 'on')
+
+SOCKETIO_TRANSPORTS = [t.strip() for t in
+                       os.environ.get('SOCKETIO_TRANSPORTS', 'polling,websocket').split(',') if t.strip()]
+socketio = SocketIO(
+    app,
+    ping_interval=float(os.environ.get('SOCKETIO_PING_INTERVAL', 25)),
+    ping_timeout=float(os.environ.get('SOCKETIO_PING_TIMEOUT', 20)),
+    http_compression=env_flag('SOCKETIO_HTTP_COMPRESSION', True),
+    compression_threshold=int(os.environ.get('SOCKETIO_COMPRESSION_THRESHOLD', 1024)),
+    allow_upgrades='websocket' in SOCKETIO_TRANSPORTS
+)
+app.wsgi_app = TransportGuard(app.wsgi_app, SOCKETIO_TRANSPORTS,
+                              websocket_deflate=env_flag('SOCKETIO_WEBSOCKET_DEFLATE', True))
+
+# 排行榜存储，后台线程批量写入 SQLite
+leaderboard = LeaderboardStore(os.environ.get('LEADERBOARD_DB', 'leaderboard.db'))
+leaderboard.start()
+
+TICK_INTERVAL = 0.016  # ~60 FPS
+FIRE_COOLDOWN = 0.2  # 两次射击的最小间隔（秒）
+MAX_SHIP_X = 1200 - 50  # 飞船左上角坐标的范围，与客户端的边界检查一致
+MAX_SHIP_Y = 800 - 50
+GAME_MODES = ('endless', 'feature', 'twoPlayer')  # 客户端可以开的模式
+
+# 每个 socket 每种事件的令牌桶: 事件名 -> (每秒速率, 突发上限)
+rate_limiter = RateLimiter({
+    'playerMove': (60, 20),
+    'playerShoot': (20, 5),
+    'startGame': (1, 3),
+    'rejoinGame': (1, 3)
+})
+# 帧耗时超出预算时进入过载模式
+overload = OverloadGuard(budget=TICK_INTERVAL)
+last_shot = {}  # 玩家上次射击时间
+pending_moves = {}  # 过载模式下合并的移动输入，每帧只应用最后一次
+
+# 检查点: 按墙钟时间每 CHECKPOINT_INTERVAL 秒保存一次，保存时间同时是所属
+# worker 的心跳；超过 CHECKPOINT_STALE 秒未更新的检查点视为所属 worker 已退出，
+# 可以被其他 worker 接管。不按帧数计时，因为过载时帧会变慢，心跳不能跟着变慢
+CHECKPOINT_INTERVAL = 5
+CHECKPOINT_STALE = CHECKPOINT_INTERVAL * 3
+REJOIN_TIMEOUT = 30  # 接管的房间在这段时间内没有玩家重连就丢弃
+checkpoint_store = FileCheckpointStore(os.environ.get('CHECKPOINT_DIR', 'checkpoints'))
+# 房间 id -> 锁：后台写检查点与删除、迁移检查点按顺序进行，
+# 已移除的房间不会被迟到的写入复活
+checkpoint_locks: Dict[str, threading.Lock] = {}
+rejoin_deadlines: Dict[str, float] = {}  # 接管的房间 id -> 等待重连的截止时间
+draining = False  # drain 后不再接受新比赛，房间交给其他 worker
+
+# 按需性能采样，由管理接口触发
+profiler = TickProfiler()
+MAX_PROFILE_SECONDS = 60
+
+# 双人模式匹配；房间容量按实测帧耗时计算，MAX_ROOMS 为上限。
+# 队列满时可以用 OVERFLOW_REDIRECT_URL 把玩家引导到其他服务器
+matchmaker = Matchmaker(
+    max_rooms=int(os.environ.get('MAX_ROOMS', 50)),
+    max_waiting=int(os.environ.get('MAX_WAITING', 200)),
+    budget=TICK_INTERVAL
+)
+OVERFLOW_REDIRECT_URL = os.environ.get('OVERFLOW_REDIRECT_URL')
 
 # 游戏状态类
 @dataclass
@@ -21,8 +105,10 @@ class GameState:
     scores: Dict = None  # 玩家分数
     game_active: bool = False
     game_mode: str = None
+    tick: int = 0
     
     def __init__(self):
+        self.rng = random.Random()  # 每局独立的随机数，随检查点一起保存
         self.reset()
     
     def reset(self):
@@ -33,128 +119,410 @@ class GameState:
         self.scores = {}
         self.game_active = False
         self.game_mode = None
+        self.tick = 0
+        self.rejoin_tokens = {}  # 重连令牌 -> 玩家 id，不发送给客户端
+        self.rng.seed()
 
-# 全局游戏状态
-game_state = GameState()
+# 本 worker 上运行中的房间，每个房间一个 Socket.IO room 和一个游戏循环
+rooms: Dict[str, GameState] = {}
+player_rooms: Dict[str, str] = {}  # 玩家 id -> 房间 id
+rejoin_rooms: Dict[str, str] = {}  # 重连令牌 -> 房间 id
+RESTORE_SCAN_INTERVAL = 1.0  # 重连令牌未知时，两次扫描检查点存储的最小间隔（秒）
+last_restore_scan = 0.0
 
 @app.route('/')
 def index():
-    return render_template('game.html')
+    return render_template('game.html', socket_options=client_options(SOCKETIO_TRANSPORTS))
+
+@app.route('/leaderboard')
+def get_leaderboard():
+    limit = max(1, min(request.args.get('limit', 10, type=int), 100))
+    return jsonify(leaderboard.top(limit))
+
+def admin_required(view):
+    """管理接口需要在 X-Admin-Token 头中提供 ADMIN_TOKEN"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = request.headers.get('X-Admin-Token', '')
+        if not ADMIN_TOKEN or not hmac.compare_digest(token, ADMIN_TOKEN):
+            return jsonify({'error': 'forbidden'}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+@app.route('/admin/status')
+@admin_required
+def admin_status():
+    return jsonify({
+        'rooms': len(rooms),
+        'capacity': room_capacity(),
+        'waiting': matchmaker.waiting,
+        'avg_tick_ms': overload.avg_tick * 1000,
+        'overloaded': overload.active,
+        'draining': draining
+    })
+
+@app.route('/admin/drain', methods=['POST'])
+@admin_required
+def admin_drain():
+    return jsonify({'draining': True, 'migrated': drain()})
+
+@app.route('/admin/profile', methods=['POST'])
+@admin_required
+def admin_start_profile():
+    """采样接下来 seconds 秒的帧，room 默认为任意一个运行中的房间"""
+    seconds = max(0.1, min(request.args.get('seconds', 10, type=float), MAX_PROFILE_SECONDS))
+    room_id = request.args.get('room') or next(iter(rooms), None)
+    if room_id is None:
+        return jsonify({'error': 'no active room'}), 400
+    if room_id not in rooms:
+        return jsonify({'error': f'unknown room {room_id}'}), 404
+    profiler.check_deadline()
+    capture = profiler.start(room_id, seconds)
+    if capture is None:
+        return jsonify({'error': 'profile already running', 'id': profiler.current.id}), 409
+    return jsonify(capture.summary()), 202
+
+@app.route('/admin/profile/<capture_id>')
+@admin_required
+def admin_get_profile(capture_id):
+    """format=summary（默认）、pstats、speedscope 或 text"""
+    profiler.check_deadline()
+    capture = profiler.get(capture_id)
+    if capture is None:
+        return jsonify({'error': 'not found'}), 404
+    fmt = request.args.get('format', 'summary')
+    if fmt == 'summary' or not capture.done:
+        return jsonify(capture.summary()), 200 if capture.done else 202
+    if fmt == 'pstats':
+        return Response(capture.pstats, mimetype='application/octet-stream', headers={
+            'Content-Disposition': f'attachment; filename=profile-{capture.id}.pstats'})
+    if fmt == 'speedscope':
+        return Response(capture.speedscope(), mimetype='application/json', headers={
+            'Content-Disposition': f'attachment; filename=profile-{capture.id}.speedscope.json'})
+    if fmt == 'text':
+        return Response(capture.top_functions(), mimetype='text/plain')
+    return jsonify({'error': f'unknown format {fmt}'}), 400
 
 @socketio.on('connect')
 def handle_connect():
     print('Client connected')
-    emit('gameState', asdict(game_state))
 
 @socketio.on('startGame')
 def handle_start_game(data):
+    player_id = request.sid
+    if not rate_limiter.allow(player_id, 'startGame'):
+        return
+    # 过载时拒绝开新局，保证已有比赛的延迟
+    if overload.active:
+        emit('serverBusy', {'reason': 'overloaded'})
+        return
+    if draining:
+        emit('serverBusy', {'reason': 'draining'})
+        return
+    # mode 会写进检查点和排行榜，只接受已知的模式
+    if not isinstance(data, dict):
+        return
     mode = data.get('mode', 'endless')
-    game_state.game_mode = mode
-    game_state.game_active = True
-    game_state.reset()
+    if mode not in GAME_MODES:
+        return
+    
+    # 先确认新的一局能开始，再离开当前房间；被拒绝时玩家留在原来的比赛里
+    # 双人模式先排队，凑满一局且有空余容量时开房
+    if mode == 'twoPlayer':
+        # 已在排队的玩家重复点击时保持原来的位置
+        if player_id in matchmaker:
+            emit('matchQueued', {'waiting': matchmaker.waiting})
+            return
+        if matchmaker.full:
+            emit('serverBusy', {'reason': 'full', 'redirect': OVERFLOW_REDIRECT_URL})
+            return
+        leave_room(player_id, admit=False)
+        matchmaker.enqueue(player_id)
+        admit_waiting()
+        if player_id in matchmaker:
+            emit('matchQueued', {'waiting': matchmaker.waiting})
+        return
+    
+    # 玩家独占的房间会随离开关闭，它的名额直接给新的一局
+    current = rooms.get(player_rooms.get(player_id))
+    reused = 1 if current is not None and set(current.ships) <= {player_id} else 0
+    if len(rooms) - reused >= room_capacity():
+        emit('serverBusy', {'reason': 'full', 'redirect': OVERFLOW_REDIRECT_URL})
+        return
+    matchmaker.remove(player_id)
+    leave_room(player_id, admit=False)
+    create_room(mode, [player_id])
+
+@socketio.on('rejoinGame')
+def handle_rejoin_game(data):
+    """迁移或重连后，把旧连接的飞船、分数和子弹转给新连接"""
+    if not rate_limiter.allow(request.sid, 'rejoinGame'):
+        return
+    if draining:
+        emit('roomMigrating')
+        return
+    token = data.get('token') if isinstance(data, dict) else None
+    room_id = rejoin_rooms.get(token)
+    # 令牌未知时房间可能还在存储里等待接管，但限制扫描频率
+    if room_id is None and token and maybe_restore_rooms():
+        room_id = rejoin_rooms.get(token)
+    state = rooms.get(room_id)
+    old_id = state.rejoin_tokens[token] if state else None
+    if old_id is None or old_id not in state.ships:
+        emit('rejoinFailed')
+        return
     
-    # 初始化玩家飞船
     player_id = request.sid
-    game_state.ships[player_id] = {
-        'x': 600,
-        'y': 700,
-        'health': 3,
-        'power_ups': {}
-    }
-    game_state.scores[player_id] = 0
+    state.ships[player_id] = state.ships.pop(old_id)
+    state.scores[player_id] = state.scores.pop(old_id, 0)
+    for bullet in state.bullets:
+        if bullet['player_id'] == old_id:
+            bullet['player_id'] = player_id
+    state.rejoin_tokens[token] = player_id
+    rejoin_deadlines.pop(room_id, None)
+    player_rooms.pop(old_id, None)
+    player_rooms[player_id] = room_id
+    socketio.server.enter_room(player_id, room_id, namespace='/')
     
-    emit('gameStarted', {'mode': mode, 'playerId': player_id}, broadcast=True)
-    start_game_loop()
+    emit('gameStarted', {'mode': state.game_mode, 'playerId': player_id})
 
 @socketio.on('disconnect')
 def handle_disconnect():
     player_id = request.sid
-    if player_id in game_state.ships:
-        del game_state.ships[player_id]
-    if player_id in game_state.scores:
-        del game_state.scores[player_id]
+    matchmaker.remove(player_id)
+    leave_room(player_id)
+    rate_limiter.forget(player_id)
+    last_shot.pop(player_id, None)
+    pending_moves.pop(player_id, None)
 
 @socketio.on('playerMove')
 def handle_player_move(data):
     player_id = request.sid
-    if player_id in game_state.ships:
-        ship = game_state.ships[player_id]
-        ship['x'] = data['x']
-        ship['y'] = data['y']
-        emit('gameState', asdict(game_state), broadcast=True)
+    if not rate_limiter.allow(player_id, 'playerMove'):
+        return
+    move = parse_move(data)
+    if move is None:
+        return
+    room_id = player_rooms.get(player_id)
+    state = rooms.get(room_id)
+    if state is not None and player_id in state.ships:
+        # 过载时只记录最新位置，由游戏循环统一应用和广播
+        if overload.active:
+            pending_moves[player_id] = move
+            return
+        ship = state.ships[player_id]
+        ship['x'], ship['y'] = move
+        emit('gameState', asdict(state), to=room_id)
+
+def parse_move(data):
+    """校验客户端发来的坐标并限制在场地内，非法数据返回 None"""
+    if not isinstance(data, dict):
+        return None
+    x, y = data.get('x'), data.get('y')
+    for value in (x, y):
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+            return None
+    return (min(max(x, 0), MAX_SHIP_X), min(max(y, 0), MAX_SHIP_Y))
 
 @socketio.on('playerShoot')
 def handle_player_shoot():
     player_id = request.sid
-    if player_id in game_state.ships:
-        ship = game_state.ships[player_id]
+    if not rate_limiter.allow(player_id, 'playerShoot'):
+        return
+    # 服务器端射击冷却，按住空格也不会无限制地生成子弹
+    now = time.monotonic()
+    if now - last_shot.get(player_id, 0) < FIRE_COOLDOWN:
+        return
+    room_id = player_rooms.get(player_id)
+    state = rooms.get(room_id)
+    if state is not None and player_id in state.ships:
+        last_shot[player_id] = now
+        ship = state.ships[player_id]
         bullet = {
             'x': ship['x'],
             'y': ship['y'] - 20,
             'player_id': player_id
         }
-        game_state.bullets.append(bullet)
-        emit('gameState', asdict(game_state), broadcast=True)
+        state.bullets.append(bullet)
+        if not overload.active:
+            emit('gameState', asdict(state), to=room_id)
+
+def room_capacity():
+    """本 worker 当前能承载的房间数"""
+    return matchmaker.capacity(overload.avg_tick)
+
+def admit_waiting():
+    """容量允许时，把排队的玩家配对开房"""
+    while not draining and not overload.active and len(rooms) < room_capacity():
+        players = matchmaker.pop_match()
+        if players is None:
+            break
+        create_room('twoPlayer', players)
+
+def create_room(mode, players):
+    """创建房间，放入玩家飞船并启动游戏循环"""
+    room_id = uuid.uuid4().hex[:12]
+    state = GameState()
+    state.game_mode = mode
+    state.game_active = True
+    rooms[room_id] = state
+    
+    # 多名玩家时沿 x 轴均匀分布
+    for i, player_id in enumerate(players):
+        state.ships[player_id] = {
+            'x': 1200 * (i + 1) // (len(players) + 1),
+            'y': 700,
+            'health': 3,
+            'power_ups': {}
+        }
+        state.scores[player_id] = 0
+        player_rooms[player_id] = room_id
+        socketio.server.enter_room(player_id, room_id, namespace='/')
+        
+        # 房间迁移后凭令牌找回自己的飞船，令牌只发给本人
+        token = secrets.token_urlsafe(16)
+        state.rejoin_tokens[token] = player_id
+        rejoin_rooms[token] = room_id
+        socketio.emit('rejoinToken', {'token': token}, to=player_id)
+        socketio.emit('gameStarted', {'mode': mode, 'playerId': player_id, 'roomId': room_id},
+                      to=player_id)
+    
+    start_game_loop(room_id)
+    return room_id
 
-def start_game_loop():
-    """启动游戏主循环"""
+def leave_room(player_id, admit=True):
+    """玩家离开所在房间，房间没人时关闭；admit 见 remove_room"""
+    room_id = player_rooms.pop(player_id, None)
+    state = rooms.get(room_id)
+    if state is None:
+        return
+    state.ships.pop(player_id, None)
+    state.scores.pop(player_id, None)
+    socketio.server.leave_room(player_id, room_id, namespace='/')
+    if not state.ships:
+        remove_room(room_id, admit)
+
+def remove_room(room_id, admit=True):
+    """停止并移除房间，腾出的容量留给排队的玩家
+
+    admit=False 时不放行排队的玩家，由调用方自己使用腾出的名额
+    """
+    state = rooms.pop(room_id, None)
+    if state is None:
+        return
+    state.game_active = False
+    for player_id in state.ships:
+        player_rooms.pop(player_id, None)
+    for token in state.rejoin_tokens:
+        rejoin_rooms.pop(token, None)
+    rejoin_deadlines.pop(room_id, None)
+    socketio.server.close_room(room_id, namespace='/')
+    # 等正在进行的写入完成后再删除；之后的写入看到房间已移除会直接跳过。
+    # 可能在帧内执行（end_game），等待期间会让出 hub，暂停采样
+    with profiler.paused(), checkpoint_locks.pop(room_id, threading.Lock()):
+        run_blocking(checkpoint_store.delete, room_id)
+    # 最后一个房间结束后没有循环再更新过载状态
+    if not rooms:
+        overload.idle()
+    if admit:
+        admit_waiting()
+
+def start_game_loop(room_id):
+    """启动房间的游戏主循环"""
+    state = rooms[room_id]
+    checkpoint_locks[room_id] = threading.Lock()
+    
     def game_loop():
-        while game_state.game_active:
-            update_game_state()
-            emit('gameState', asdict(game_state), broadcast=True)
-            socketio.sleep(0.016)  # ~60 FPS
+        next_checkpoint = time.monotonic() + CHECKPOINT_INTERVAL
+        while state.game_active and rooms.get(room_id) is state and not draining:
+            deadline = rejoin_deadlines.get(room_id)
+            if deadline is not None and time.monotonic() > deadline:
+                print(f'Dropping restored room {room_id}: no player rejoined')
+                remove_room(room_id)
+                break
+            start = time.perf_counter()
+            profiler.begin_tick(room_id)
+            with profiler.phase(room_id, 'simulate'):
+                apply_pending_moves(state)
+                update_game_state(state)
+            with profiler.phase(room_id, 'collide'):
+                check_collisions(room_id, state)
+            # 过载时降低广播频率
+            if state.tick % overload.send_interval == 0:
+                with profiler.phase(room_id, 'serialize'):
+                    payload = asdict(state)
+                with profiler.phase(room_id, 'emit'):
+                    socketio.emit('gameState', payload, to=room_id)
+            profiler.end_tick(room_id)
+            state.tick += 1
+            if time.monotonic() >= next_checkpoint and state.game_active:
+                save_checkpoint(room_id, state)
+                next_checkpoint = time.monotonic() + CHECKPOINT_INTERVAL
+            elapsed = time.perf_counter() - start
+            overload.record(elapsed, len(rooms))
+            # 容量随帧耗时回升（或退出过载模式）后放行排队的玩家
+            if matchmaker.waiting and not overload.active and len(rooms) < room_capacity():
+                admit_waiting()
+            socketio.sleep(max(0, TICK_INTERVAL - elapsed))
     
     socketio.start_background_task(game_loop)
 
-def update_game_state():
+def apply_pending_moves(state):
+    """应用过载模式下合并的移动输入"""
+    if not pending_moves:
+        return
+    for player_id, ship in state.ships.items():
+        move = pending_moves.pop(player_id, None)
+        if move is not None:
+            ship['x'], ship['y'] = move
+
+def update_game_state(state):
     """更新游戏状态"""
     # 更新子弹位置
-    for bullet in game_state.bullets[:]:
+    for bullet in state.bullets[:]:
         bullet['y'] -= 5
         if bullet['y'] < 0:
-            game_state.bullets.remove(bullet)
+            state.bullets.remove(bullet)
     
     # 生成新的外星人
-    if random.random() < 0.02:  # 2%概率生成新外星人
+    rng = state.rng
+    if rng.random() < 0.02:  # 2%概率生成新外星人
         alien = {
-            'x': random.randint(0, 1150),
+            'x': rng.randint(0, 1150),
             'y': -50,
-            'health': random.randint(2, 4),
-            'type': random.randint(1, 3)
+            'health': rng.randint(2, 4),
+            'type': rng.randint(1, 3)
         }
-        game_state.aliens.append(alien)
+        state.aliens.append(alien)
     
     # 更新外星人位置
-    for alien in game_state.aliens[:]:
+    for alien in state.aliens[:]:
         alien['y'] += 2
         if alien['y'] > 800:
-            game_state.aliens.remove(alien)
-    
-    # 检测碰撞
-    check_collisions()
+            state.aliens.remove(alien)
 
-def check_collisions():
+def check_collisions(room_id, state):
     """检查所有碰撞"""
     # 子弹与外星人的碰撞
-    for bullet in game_state.bullets[:]:
-        for alien in game_state.aliens[:]:
+    for bullet in state.bullets[:]:
+        for alien in state.aliens[:]:
             if check_collision(bullet, alien):
                 alien['health'] -= 1
                 if alien['health'] <= 0:
-                    game_state.aliens.remove(alien)
-                    if bullet['player_id'] in game_state.scores:
-                        game_state.scores[bullet['player_id']] += 50
-                game_state.bullets.remove(bullet)
+                    state.aliens.remove(alien)
+                    if bullet['player_id'] in state.scores:
+                        state.scores[bullet['player_id']] += 50
+                state.bullets.remove(bullet)
                 break
 
     # 外星人与飞船的碰撞
-    for alien in game_state.aliens[:]:
-        for player_id, ship in game_state.ships.items():
+    for alien in state.aliens[:]:
+        for player_id, ship in state.ships.items():
             if check_collision(alien, ship):
                 ship['health'] -= 1
-                game_state.aliens.remove(alien)
+                state.aliens.remove(alien)
                 if ship['health'] <= 0:
-                    end_game(player_id)
+                    end_game(room_id, state)
                 break
 
 def check_collision(obj1, obj2):
@@ -162,13 +530,119 @@ def check_collision(obj1, obj2):
     return (abs(obj1['x'] - obj2['x']) < 40 and 
             abs(obj1['y'] - obj2['y']) < 40)
 
-def end_game(player_id):
+def end_game(room_id, state):
     """结束游戏"""
-    game_state.game_active = False
-    emit('gameOver', {
-        'scores': game_state.scores,
-        'winner': max(game_state.scores.items(), key=lambda x: x[1])[0]
-    }, broadcast=True)
+    if not state.game_active:
+        return
+    state.game_active = False
+    winner = max(state.scores.items(), key=lambda x: x[1])[0]
+    # 记录比赛结果，只入队不等待磁盘
+    leaderboard.submit(uuid.uuid4().hex, state.game_mode,
+                       state.scores, winner)
+    socketio.emit('gameOver', {
+        'scores': state.scores,
+        'winner': winner
+    }, to=room_id)
+    remove_room(room_id)
+
+def save_checkpoint(room_id, state):
+    """在循环中编码，写盘交给后台任务，不阻塞本帧
+
+    eventlet 下后台任务也是绿色线程，文件写入再经 run_blocking 放到
+    tpool 的系统线程中执行，不会卡住 hub 上的其他房间。
+    """
+    data = encode_checkpoint(room_id, state)
+    socketio.start_background_task(write_checkpoint, room_id, state, data)
+
+def write_checkpoint(room_id, state, data):
+    """后台写入检查点；房间已移除或正在迁移时跳过，不覆盖删除或迁移检查点"""
+    lock = checkpoint_locks.get(room_id)
+    if lock is None:
+        return
+    with lock:
+        if draining or rooms.get(room_id) is not state:
+            return
+        run_blocking(checkpoint_store.save, room_id, data)
+
+def drain():
+    """停止本 worker 上的所有房间，写入迁移检查点并通知客户端重连"""
+    global draining
+    draining = True
+    migrated = []
+    for room_id, state in list(rooms.items()):
+        if state.game_active:
+            with checkpoint_locks.get(room_id, threading.Lock()):
+                run_blocking(checkpoint_store.save, room_id,
+                             encode_checkpoint(room_id, state, migrating=True))
+            migrated.append(room_id)
+            socketio.emit('roomMigrating', {'roomId': room_id}, to=room_id)
+    # 只清理本地状态，检查点留给接管的 worker
+    rooms.clear()
+    player_rooms.clear()
+    rejoin_rooms.clear()
+    rejoin_deadlines.clear()
+    checkpoint_locks.clear()
+    # 排队的玩家也重连到其他 worker 重新排队
+    for player_id in matchmaker.clear():
+        socketio.emit('roomMigrating', {}, to=player_id)
+    return migrated
+
+def restore_rooms():
+    """在容量允许时接管正在迁移或所属 worker 已退出的房间"""
+    restored = []
+    for room_id in run_blocking(checkpoint_store.list):
+        if draining or len(rooms) >= room_capacity():
+            break
+        if room_id in rooms:
+            continue
+        data = run_blocking(checkpoint_store.load, room_id)
+        if data is None:
+            continue
+        try:
+            flags, _, saved_at = read_header(data)
+        except CheckpointError as e:
+            print(f'Discarding checkpoint {room_id}: {e}')
+            run_blocking(checkpoint_store.delete, room_id)
+            continue
+        # 所属 worker 还在定期更新的检查点不能接管
+        if not flags & FLAG_MIGRATING and time.time() - saved_at < CHECKPOINT_STALE:
+            continue
+        data = run_blocking(checkpoint_store.take, room_id)
+        if data is None:
+            continue  # 已被其他 worker 接管
+        state = GameState()
+        try:
+            decode_checkpoint(data, state)
+        except CheckpointError as e:
+            print(f'Discarding checkpoint {room_id}: {e}')
+            continue
+        if not state.game_active:
+            continue
+        # 玩家重连时凭令牌进入房间，在那之前飞船留在原地
+        rooms[room_id] = state
+        for token in state.rejoin_tokens:
+            rejoin_rooms[token] = room_id
+        rejoin_deadlines[room_id] = time.monotonic() + REJOIN_TIMEOUT
+        restored.append(room_id)
+        start_game_loop(room_id)
+    return restored
+
+def maybe_restore_rooms():
+    """最多每 RESTORE_SCAN_INTERVAL 秒扫描一次存储，返回是否接管了新房间"""
+    global last_restore_scan
+    now = time.monotonic()
+    if now - last_restore_scan < RESTORE_SCAN_INTERVAL:
+        return False
+    last_restore_scan = now
+    return bool(restore_rooms())
+
+def checkpoint_watcher():
+    """定期检查是否有可接管的房间"""
+    while not draining:
+        restore_rooms()
+        socketio.sleep(CHECKPOINT_STALE)
+
+socketio.start_background_task(checkpoint_watcher)
 
 if __name__ == '__main__':
     socketio.run(app, debug=True)
\ No newline at end of file
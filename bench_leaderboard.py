@@ -0,0 +1,46 @@
+import os
+import random
+import tempfile
+import time
+import uuid
+
+from leaderboard import LeaderboardStore
+
+# 排行榜写入基准：测量后台批量写入的 inserts/sec 和 top-N 查询耗时
+# 用法: python bench_leaderboard.py [比赛场数]
+
+
+def bench(matches=20000, players=2):
+    with tempfile.TemporaryDirectory() as tmp:
+        store = LeaderboardStore(os.path.join(tmp, 'bench.db'), max_queue=matches)
+
+        # submit() 的耗时就是游戏循环实际要付出的代价
+        start = time.perf_counter()
+        for _ in range(matches):
+            scores = {uuid.uuid4().hex: random.randint(0, 5000) for _ in range(players)}
+            store.submit(uuid.uuid4().hex, 'endless', scores, next(iter(scores)))
+        submit_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        store.start()
+        store.stop(timeout=None)
+        write_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        store.top(10)
+        cold = time.perf_counter() - start
+        start = time.perf_counter()
+        store.top(10)
+        warm = time.perf_counter() - start
+
+        rows = store.count()
+        print(f"matches:          {matches} ({rows} score rows, {store.dropped} dropped)")
+        print(f"submit:           {submit_time / matches * 1e6:.2f} us/match")
+        print(f"writer:           {rows / write_time:.0f} inserts/sec")
+        print(f"top(10) cold:     {cold * 1e3:.2f} ms")
+        print(f"top(10) cached:   {warm * 1e6:.2f} us")
+
+
+if __name__ == '__main__':
+    import sys
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
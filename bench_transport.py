@@ -0,0 +1,153 @@
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import socketio
+
+# 传输配置基准：用机器人客户端比较不同 Socket.IO 配置下服务器的 CPU 和流量
+#
+# 每种配置启动一个独立的服务器进程，连接 N 个机器人客户端，每个机器人都
+# 排双人模式，两两配对开局（游戏结束后自动重新排队），所以 N 应为偶数；
+# 然后统计 duration 秒内：
+#   - 服务器进程的 CPU 时间（/proc/<pid>/stat）
+#   - 回环网卡的总字节数（/proc/net/dev，包含 HTTP/帧头开销）
+#   - 机器人收到的 gameState 数量和 JSON 负载字节数
+#
+# 需要 Linux，以及 python-socketio 客户端依赖: pip install requests websocket-client
+# 注意: Python 的 websocket-client 不协商 permessage-deflate，websocket 压缩的效果
+# 需要用浏览器客户端测量。
+#
+# 用法: python bench_transport.py [--bots 20] [--duration 10] [--config websocket ...]
+
+CONFIGS = {
+    # 名称: (服务器环境变量, 客户端传输方式)
+    'polling': ({'SOCKETIO_TRANSPORTS': 'polling'}, ['polling']),
+    'polling-nocompress': ({'SOCKETIO_TRANSPORTS': 'polling',
+                            'SOCKETIO_HTTP_COMPRESSION': '0'}, ['polling']),
+    'upgrade': ({'SOCKETIO_TRANSPORTS': 'polling,websocket'}, ['polling', 'websocket']),
+    'websocket': ({'SOCKETIO_TRANSPORTS': 'websocket'}, ['websocket']),
+}
+
+SERVER = 'from app import app, socketio; socketio.run(app, host="127.0.0.1", port={port})'
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port, timeout=15):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f'server did not start on port {port}')
+
+
+def cpu_seconds(pid):
+    with open(f'/proc/{pid}/stat') as f:
+        fields = f.read().rsplit(')', 1)[1].split()
+    # utime 和 stime 是第 14、15 个字段，这里去掉了前两个
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+def loopback_bytes():
+    with open('/proc/net/dev') as f:
+        for line in f:
+            name, _, data = line.partition(':')
+            if name.strip() == 'lo':
+                return int(data.split()[8])  # 发送字节数
+    return 0
+
+
+class Bot:
+    def __init__(self, url, transports):
+        self.client = socketio.Client(reconnection=False)
+        self.states = 0
+        self.payload_bytes = 0
+
+        @self.client.on('gameState')
+        def on_state(state):
+            self.states += 1
+            self.payload_bytes += len(json.dumps(state, separators=(',', ':')))
+
+        @self.client.on('gameOver')
+        def on_game_over(data):
+            self.client.emit('startGame', {'mode': 'twoPlayer'})
+
+        self.client.connect(url, transports=transports)
+        self.client.emit('startGame', {'mode': 'twoPlayer'})
+
+    def close(self):
+        self.client.disconnect()
+
+
+def run(name, bots, duration, warmup=1.0):
+    env_overrides, transports = CONFIGS[name]
+    port = free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, **env_overrides,
+                   LEADERBOARD_DB=os.path.join(tmp, 'leaderboard.db'),
+                   CHECKPOINT_DIR=os.path.join(tmp, 'checkpoints'))
+        server = subprocess.Popen([sys.executable, '-c', SERVER.format(port=port)],
+                                  cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_for_port(port)
+            url = f'http://127.0.0.1:{port}'
+            clients = [Bot(url, transports) for _ in range(bots)]
+            time.sleep(warmup)
+
+            cpu_start, net_start = cpu_seconds(server.pid), loopback_bytes()
+            states_start = sum(c.states for c in clients)
+            payload_start = sum(c.payload_bytes for c in clients)
+            time.sleep(duration)
+            cpu = cpu_seconds(server.pid) - cpu_start
+            wire = loopback_bytes() - net_start
+            states = sum(c.states for c in clients) - states_start
+            payload = sum(c.payload_bytes for c in clients) - payload_start
+
+            for c in clients:
+                c.close()
+        finally:
+            server.terminate()
+            server.wait()
+
+    return {
+        'config': name,
+        'cpu_pct': cpu / duration * 100,
+        'wire_kib_s': wire / duration / 1024,
+        'payload_kib_s': payload / duration / 1024,
+        'states_s': states / duration,
+        'cpu_us_per_state': cpu / states * 1e6 if states else 0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Socket.IO 传输配置基准')
+    parser.add_argument('--bots', type=int, default=20, help='机器人数量，两两配对，应为偶数')
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--config', action='append', choices=sorted(CONFIGS))
+    args = parser.parse_args()
+    if args.bots % 2:
+        parser.error('--bots must be even')
+
+    print(f"{'config':<20}{'cpu %':>8}{'wire KiB/s':>12}{'payload KiB/s':>15}"
+          f"{'states/s':>10}{'cpu us/state':>14}")
+    for name in args.config or CONFIGS:
+        r = run(name, args.bots, args.duration)
+        print(f"{r['config']:<20}{r['cpu_pct']:>8.1f}{r['wire_kib_s']:>12.1f}"
+              f"{r['payload_kib_s']:>15.1f}{r['states_s']:>10.0f}{r['cpu_us_per_state']:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
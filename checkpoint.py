@@ -0,0 +1,266 @@
+import json
+import os
+import struct
+import time
+import uuid
+import zlib
+
+# 房间状态检查点：紧凑的二进制格式 + 可替换的存储
+#
+# 格式（小端）:
+#   头部     magic, 版本, 标志, tick, 保存时间
+#   字符串   房间 id, 游戏模式
+#   玩家表   所有玩家 id 只存一次，其余地方用下标引用
+#   随机数   random.Random 的内部状态
+#   实体     飞船, 分数, 外星人, 子弹, 道具, 重连令牌
+#   尾部     CRC32 校验
+
+MAGIC = b'SJCP'
+VERSION = 1
+
+FLAG_ACTIVE = 1  # 比赛进行中
+FLAG_MIGRATING = 2  # 由 drain 写入，等待其他 worker 接管
+
+HEADER = struct.Struct('<4sBBQd')
+U16 = struct.Struct('<H')
+U32 = struct.Struct('<I')
+SHIP = struct.Struct('<Hffh')
+SCORE = struct.Struct('<Hq')
+ALIEN = struct.Struct('<ffhB')
+BULLET = struct.Struct('<ffH')
+POWER_UP = struct.Struct('<ffB')
+RNG_STATE = struct.Struct('<B625I')
+GAUSS = struct.Struct('<Bd')
+
+
+class CheckpointError(Exception):
+    """检查点数据损坏或版本不兼容"""
+
+
+class _Writer:
+    def __init__(self):
+        self.parts = []
+
+    def pack(self, fmt, *values):
+        self.parts.append(fmt.pack(*values))
+
+    def string(self, value):
+        data = (value or '').encode('utf-8')
+        self.parts.append(U16.pack(len(data)))
+        self.parts.append(data)
+
+    def getvalue(self):
+        return b''.join(self.parts)
+
+
+class _Reader:
+    def __init__(self, data):
+        self.data = data
+        self.offset = 0
+
+    def unpack(self, fmt):
+        values = fmt.unpack_from(self.data, self.offset)
+        self.offset += fmt.size
+        return values
+
+    def string(self):
+        (length,) = self.unpack(U16)
+        value = self.data[self.offset:self.offset + length].decode('utf-8')
+        self.offset += length
+        return value
+
+
+def encode_checkpoint(room_id, state, migrating=False):
+    """把房间状态编码成二进制检查点"""
+    # 玩家表：飞船、分数、子弹和令牌中出现的所有玩家 id
+    players = list(dict.fromkeys(
+        list(state.ships) + list(state.scores) +
+        [b['player_id'] for b in state.bullets] +
+        list(state.rejoin_tokens.values())
+    ))
+    index = {player_id: i for i, player_id in enumerate(players)}
+
+    flags = (FLAG_ACTIVE if state.game_active else 0) | (FLAG_MIGRATING if migrating else 0)
+    w = _Writer()
+    w.pack(HEADER, MAGIC, VERSION, flags, state.tick, time.time())
+    w.string(room_id)
+    w.string(state.game_mode)
+
+    w.pack(U16, len(players))
+    for player_id in players:
+        w.string(player_id)
+
+    rng_version, internal, gauss_next = state.rng.getstate()
+    w.pack(RNG_STATE, rng_version, *internal)
+    w.pack(GAUSS, gauss_next is not None, gauss_next or 0.0)
+
+    w.pack(U16, len(state.ships))
+    for player_id, ship in state.ships.items():
+        w.pack(SHIP, index[player_id], ship['x'], ship['y'], ship['health'])
+        # 道具效果结构不固定，用紧凑 JSON 存储
+        w.string(json.dumps(ship.get('power_ups', {}), separators=(',', ':')))
+
+    w.pack(U16, len(state.scores))
+    for player_id, score in state.scores.items():
+        w.pack(SCORE, index[player_id], score)
+
+    w.pack(U32, len(state.aliens))
+    for alien in state.aliens:
+        w.pack(ALIEN, alien['x'], alien['y'], alien['health'], alien['type'])
+
+    w.pack(U32, len(state.bullets))
+    for bullet in state.bullets:
+        w.pack(BULLET, bullet['x'], bullet['y'], index[bullet['player_id']])
+
+    w.pack(U32, len(state.power_ups))
+    for power_up in state.power_ups:
+        w.pack(POWER_UP, power_up['x'], power_up['y'], power_up['type'])
+
+    w.pack(U16, len(state.rejoin_tokens))
+    for token, player_id in state.rejoin_tokens.items():
+        w.string(token)
+        w.pack(U16, index[player_id])
+
+    body = w.getvalue()
+    return body + U32.pack(zlib.crc32(body))
+
+
+def read_header(data):
+    """只读取头部，返回 (flags, tick, saved_at)"""
+    if len(data) < HEADER.size + U32.size:
+        raise CheckpointError('checkpoint too short')
+    magic, version, flags, tick, saved_at = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise CheckpointError('not a checkpoint')
+    if version != VERSION:
+        raise CheckpointError(f'unsupported checkpoint version {version}')
+    return flags, tick, saved_at
+
+
+def decode_checkpoint(data, state):
+    """把检查点恢复到 state 中，返回房间 id"""
+    flags, tick, _ = read_header(data)
+    body, (crc,) = data[:-U32.size], U32.unpack_from(data, len(data) - U32.size)
+    if zlib.crc32(body) != crc:
+        raise CheckpointError('checkpoint checksum mismatch')
+
+    r = _Reader(body)
+    r.offset = HEADER.size
+    room_id = r.string()
+    state.reset()
+    state.game_mode = r.string() or None
+    state.game_active = bool(flags & FLAG_ACTIVE)
+    state.tick = tick
+
+    (count,) = r.unpack(U16)
+    players = [r.string() for _ in range(count)]
+
+    rng_version, *internal = r.unpack(RNG_STATE)
+    has_gauss, gauss_next = r.unpack(GAUSS)
+    state.rng.setstate((rng_version, tuple(internal), gauss_next if has_gauss else None))
+
+    (count,) = r.unpack(U16)
+    for _ in range(count):
+        i, x, y, health = r.unpack(SHIP)
+        state.ships[players[i]] = {
+            'x': x,
+            'y': y,
+            'health': health,
+            'power_ups': json.loads(r.string())
+        }
+
+    (count,) = r.unpack(U16)
+    for _ in range(count):
+        i, score = r.unpack(SCORE)
+        state.scores[players[i]] = score
+
+    (count,) = r.unpack(U32)
+    for _ in range(count):
+        x, y, health, alien_type = r.unpack(ALIEN)
+        state.aliens.append({'x': x, 'y': y, 'health': health, 'type': alien_type})
+
+    (count,) = r.unpack(U32)
+    for _ in range(count):
+        x, y, i = r.unpack(BULLET)
+        state.bullets.append({'x': x, 'y': y, 'player_id': players[i]})
+
+    (count,) = r.unpack(U32)
+    for _ in range(count):
+        x, y, power_up_type = r.unpack(POWER_UP)
+        state.power_ups.append({'x': x, 'y': y, 'type': power_up_type})
+
+    (count,) = r.unpack(U16)
+    for _ in range(count):
+        token = r.string()
+        (i,) = r.unpack(U16)
+        state.rejoin_tokens[token] = players[i]
+
+    return room_id
+
+
+class CheckpointStore:
+    """检查点存储接口，可替换为 Redis、对象存储等实现"""
+
+    def save(self, room_id, data):
+        raise NotImplementedError
+
+    def load(self, room_id):
+        raise NotImplementedError
+
+    def take(self, room_id):
+        """原子地取出并删除检查点，多个 worker 竞争时只有一个能拿到"""
+        raise NotImplementedError
+
+    def delete(self, room_id):
+        raise NotImplementedError
+
+    def list(self):
+        raise NotImplementedError
+
+
+class FileCheckpointStore(CheckpointStore):
+    """保存在本地（或共享）目录中，每个房间一个文件"""
+
+    SUFFIX = '.ckpt'
+
+    def __init__(self, directory='checkpoints'):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, room_id):
+        return os.path.join(self.directory, room_id + self.SUFFIX)
+
+    def save(self, room_id, data):
+        # 先写临时文件再替换，读者不会看到写了一半的检查点
+        tmp = self._path(room_id) + f'.{uuid.uuid4().hex}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, self._path(room_id))
+
+    def load(self, room_id):
+        try:
+            with open(self._path(room_id), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def take(self, room_id):
+        claimed = self._path(room_id) + f'.{uuid.uuid4().hex}.claimed'
+        try:
+            os.rename(self._path(room_id), claimed)
+        except FileNotFoundError:
+            return None
+        with open(claimed, 'rb') as f:
+            data = f.read()
+        os.remove(claimed)
+        return data
+
+    def delete(self, room_id):
+        try:
+            os.remove(self._path(room_id))
+        except FileNotFoundError:
+            pass
+
+    def list(self):
+        return [name[:-len(self.SUFFIX)] for name in os.listdir(self.directory)
+                if name.endswith(self.SUFFIX)]
@@ -0,0 +1,204 @@
+import sqlite3
+import time
+from typing import Dict, List
+
+from offload import os_queue, os_threading, run_blocking
+
+# 排行榜存储：SQLite (WAL) + 有界队列 + 后台批量写入
+#
+# 游戏循环只调用 submit()，它把结果放进有界队列后立即返回，
+# 绝不等待磁盘。后台写线程按批次取出结果，在一个事务里写入，
+# 写完后让内存中的 top-N 缓存失效。批次写入失败（例如多个 worker 共用
+# 数据库时 database is locked）会重试一次，仍失败则逐条写入，坏数据只会
+# 丢掉它自己那一条，写线程不会退出。
+#
+# eventlet 下写线程必须是真实的操作系统线程（见 offload.py），否则
+# sqlite3 的阻塞调用会卡住 hub；队列、锁和事件也用原始版本，保证
+# 绿色线程和写线程之间可以安全交互。缓存未命中时的查询同样放到
+# 线程池里执行。
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS matches (
+    match_id TEXT PRIMARY KEY,
+    mode TEXT,
+    winner TEXT,
+    ended_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS scores (
+    match_id TEXT NOT NULL,
+    player_id TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    PRIMARY KEY (match_id, player_id)
+);
+CREATE INDEX IF NOT EXISTS idx_scores_score ON scores (score DESC);
+'''
+
+
+class LeaderboardStore:
+    """比赛结果与分数的持久化存储"""
+
+    def __init__(self, path='leaderboard.db', max_queue=10000,
+                 batch_size=256, flush_interval=0.5, busy_timeout=5.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.busy_timeout = busy_timeout  # 数据库被其他连接锁住时最多等待的秒数
+        self.dropped = 0  # 队列满时丢弃的结果数
+        self.failed = 0  # 写入失败丢弃的结果数
+        self._queue = os_queue.Queue(maxsize=max_queue)
+        self._cache: Dict[int, List[Dict]] = {}
+        self._cache_lock = os_threading.Lock()
+        self._version = 0  # 每次写入后递增，防止并发查询写回过期缓存
+        self._writer = None
+        self._stopping = os_threading.Event()
+        self._init_db()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout,
+                               check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _init_db(self):
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        conn.commit()
+        conn.close()
+
+    def start(self):
+        """启动后台写线程"""
+        if self._writer is not None:
+            if not self._stopping.is_set():
+                return
+            # 上次 stop() 超时，旧的写线程还在收尾，等它退出再启动新的
+            self._writer.join()
+        self._stopping.clear()
+        self._writer = os_threading.Thread(target=self._run, daemon=True)
+        self._writer.start()
+
+    def stop(self, timeout=5):
+        """停止写线程，并把队列中剩余的结果写完；超时仍未退出时返回 False"""
+        self._stopping.set()
+        if self._writer is not None:
+            self._writer.join(timeout)
+            if self._writer.is_alive():
+                return False
+            self._writer = None
+        return True
+
+    def submit(self, match_id, mode, scores, winner=None, ended_at=None):
+        """提交一场比赛的结果，不阻塞；队列已满时返回 False"""
+        result = {
+            'match_id': match_id,
+            'mode': mode,
+            'winner': winner,
+            'ended_at': ended_at or time.time(),
+            'scores': dict(scores)
+        }
+        try:
+            self._queue.put_nowait(result)
+            return True
+        except os_queue.Full:
+            self.dropped += 1
+            return False
+
+    def _drain(self, block):
+        """从队列中取出最多 batch_size 条结果"""
+        batch = []
+        try:
+            if block:
+                batch.append(self._queue.get(timeout=self.flush_interval))
+            while len(batch) < self.batch_size:
+                batch.append(self._queue.get_nowait())
+        except os_queue.Empty:
+            pass
+        return batch
+
+    def _run(self):
+        conn = self._connect()
+        try:
+            while not self._stopping.is_set():
+                batch = self._drain(block=True)
+                if batch:
+                    self._write(conn, batch)
+            # 退出前把剩余结果写完
+            batch = self._drain(block=False)
+            while batch:
+                self._write(conn, batch)
+                batch = self._drain(block=False)
+        finally:
+            conn.close()
+
+    def _write(self, conn, batch):
+        """写入一批结果，失败时重试一次，再失败就逐条写入"""
+        for _ in range(2):
+            try:
+                self._write_batch(conn, batch)
+                return
+            except sqlite3.Error as e:
+                print(f'Leaderboard batch of {len(batch)} failed: {e}')
+        for result in batch:
+            try:
+                self._write_batch(conn, [result])
+            except sqlite3.Error as e:
+                self.failed += 1
+                print(f'Leaderboard dropped match {result["match_id"]!r}: {e}')
+
+    def _write_batch(self, conn, batch):
+        with conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO matches (match_id, mode, winner, ended_at) '
+                'VALUES (?, ?, ?, ?)',
+                [(r['match_id'], r['mode'], r['winner'], r['ended_at']) for r in batch]
+            )
+            conn.executemany(
+                'INSERT OR REPLACE INTO scores (match_id, player_id, score) '
+                'VALUES (?, ?, ?)',
+                [(r['match_id'], player_id, score)
+                 for r in batch for player_id, score in r['scores'].items()]
+            )
+        self.invalidate()
+
+    def invalidate(self):
+        with self._cache_lock:
+            self._version += 1
+            self._cache.clear()
+
+    def top(self, limit=10) -> List[Dict]:
+        """查询分数最高的 limit 条记录，结果在下次写入前一直缓存"""
+        with self._cache_lock:
+            cached = self._cache.get(limit)
+            version = self._version
+        if cached is not None:
+            return cached
+
+        rows = run_blocking(self._query_top, limit)
+        result = [
+            {'player_id': r[0], 'score': r[1], 'match_id': r[2],
+             'mode': r[3], 'ended_at': r[4]}
+            for r in rows
+        ]
+        with self._cache_lock:
+            if version == self._version:
+                self._cache[limit] = result
+        return result
+
+    def _query_top(self, limit):
+        conn = self._connect()
+        try:
+            return conn.execute(
+                'SELECT s.player_id, s.score, s.match_id, m.mode, m.ended_at '
+                'FROM scores s JOIN matches m ON m.match_id = s.match_id '
+                'ORDER BY s.score DESC, m.ended_at ASC LIMIT ?',
+                (limit,)
+            ).fetchall()
+        finally:
+            conn.close()
+
+    def count(self) -> int:
+        conn = self._connect()
+        try:
+            return conn.execute('SELECT COUNT(*) FROM scores').fetchone()[0]
+        finally:
+            conn.close()
@@ -0,0 +1,88 @@
+from collections import deque
+from itertools import count
+
+# 双人模式匹配与准入控制
+#
+# 等待中的玩家放在 FIFO 队列里，每次入队领一个递增的序号，队列条目是
+# (玩家, 序号)；离开队列时只从字典中删除，出队时跳过序号对不上的条目
+# （惰性删除），所以入队、离开和每次配对都是 O(1) 均摊。玩家离开后重新
+# 排队会领到新序号，只能排在队尾，不会沿用旧条目插队。过期条目多于仍在
+# 等待的玩家时重建一次队列，队列长度不会无限增长。
+# 每个 worker 能同时运行的房间数由实测的单房间帧耗时决定，房间满了的
+# 玩家继续排队，队列也满了才拒绝。
+
+
+class Matchmaker:
+    """等待队列和房间容量"""
+
+    def __init__(self, room_size=2, max_rooms=50, max_waiting=200,
+                 budget=0.016, utilization=0.75):
+        self.room_size = room_size
+        self.max_rooms = max_rooms  # 容量上限，尚未测得帧耗时时也用它
+        self.max_waiting = max_waiting
+        self.budget = budget
+        self.utilization = utilization  # 帧预算中留给房间模拟的比例
+        self._queue = deque()  # (玩家 id, 序号)
+        self._waiting = {}  # 玩家 id -> 当前有效的序号
+        self._seq = count()
+
+    @property
+    def waiting(self):
+        return len(self._waiting)
+
+    @property
+    def full(self):
+        return len(self._waiting) >= self.max_waiting
+
+    def __contains__(self, player_id):
+        return player_id in self._waiting
+
+    def enqueue(self, player_id):
+        """加入等待队列，队列已满时返回 False"""
+        if player_id in self._waiting:
+            return True
+        if self.full:
+            return False
+        seq = self._waiting[player_id] = next(self._seq)
+        self._queue.append((player_id, seq))
+        self._compact()
+        return True
+
+    def remove(self, player_id):
+        """离开队列（断开连接或改玩单人模式）"""
+        self._waiting.pop(player_id, None)
+        self._compact()
+
+    def _live(self, entry):
+        player_id, seq = entry
+        return self._waiting.get(player_id) == seq
+
+    def _compact(self):
+        """过期条目超过一半时丢掉所有过期条目"""
+        if len(self._queue) > 2 * len(self._waiting):
+            self._queue = deque(e for e in self._queue if self._live(e))
+
+    def clear(self):
+        """清空队列，按排队顺序返回等待中的玩家"""
+        players = [e[0] for e in self._queue if self._live(e)]
+        self._queue.clear()
+        self._waiting.clear()
+        return players
+
+    def pop_match(self):
+        """取出凑满一局的玩家，人数不够时返回 None"""
+        if len(self._waiting) < self.room_size:
+            return None
+        players = []
+        while len(players) < self.room_size:
+            entry = self._queue.popleft()
+            if self._live(entry):
+                del self._waiting[entry[0]]
+                players.append(entry[0])
+        return players
+
+    def capacity(self, avg_tick):
+        """按单房间平均帧耗时估算本 worker 能承载的房间数"""
+        if avg_tick <= 0:
+            return self.max_rooms
+        return max(1, min(self.max_rooms, int(self.budget * self.utilization / avg_tick)))
@@ -0,0 +1,34 @@
+import queue
+import threading
+
+# 阻塞调用的线程辅助
+#
+# 生产环境用 gunicorn 的 eventlet worker 运行，threading 和 queue 会被
+# monkey patch 成绿色线程版本。sqlite3、文件读写这类 C 层阻塞调用在绿色
+# 线程里执行会卡住整个 hub，所有房间的游戏循环都会停下来等磁盘。
+# 这里在 eventlet 下取回原始的 threading/queue 模块，并通过 tpool 把
+# 阻塞调用放到真实的操作系统线程中执行；没有 eventlet 时直接使用标准库。
+
+try:
+    from eventlet import patcher, tpool
+except ImportError:
+    patcher = tpool = None
+
+
+def _monkey_patched():
+    return patcher is not None and patcher.is_monkey_patched('thread')
+
+
+if _monkey_patched():
+    os_threading = patcher.original('threading')
+    os_queue = patcher.original('queue')
+else:
+    os_threading = threading
+    os_queue = queue
+
+
+def run_blocking(func, *args, **kwargs):
+    """执行阻塞调用；eventlet 下交给 tpool，只挂起当前绿色线程"""
+    if tpool is not None and _monkey_patched():
+        return tpool.execute(func, *args, **kwargs)
+    return func(*args, **kwargs)
@@ -0,0 +1,168 @@
+import cProfile
+import io
+import json
+import marshal
+import pstats
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
+
+# 游戏循环的按需性能采样
+#
+# 管理员触发后，接下来 N 秒内的每一帧都在 cProfile 下运行，同时记录
+# simulate/collide/serialize/emit 各阶段的耗时。采样结束后可以下载
+# pstats 文件（snakeviz、pstats 模块）或 speedscope JSON（https://speedscope.app）。
+# 未采样时 phase() 返回空上下文，几乎没有额外开销。
+#
+# cProfile 记录的是整个线程。eventlet 下一帧内如果让出 hub，其他绿色线程
+# 的调用也会记到这次采样里，所以已知会让出的调用（检查点文件 IO）要包在
+# paused() 里；emit 写 socket 时也可能让出，这部分无法排除，结果里会附带
+# 说明。
+
+PHASES = ('simulate', 'collide', 'serialize', 'emit')
+
+
+class Capture:
+    """一次采样的结果"""
+
+    def __init__(self, room_id, seconds):
+        self.id = uuid.uuid4().hex[:12]
+        self.room_id = room_id
+        self.seconds = seconds
+        self.started_at = time.time()
+        self.deadline = time.perf_counter() + seconds
+        self.done = False
+        self.ticks = 0
+        self.phase_totals = dict.fromkeys(PHASES, 0.0)
+        self.events = []  # (O/C, 帧下标, perf_counter 时间)，帧 0 是整个 tick
+        self.origin = time.perf_counter()
+        self.pstats = None  # marshal 格式，与 pstats.Stats.dump_stats 相同
+        self.profile = cProfile.Profile()
+        self.enabled = False  # 是否处于某一帧中且 cProfile 正在记录
+
+    def summary(self):
+        return {
+            'id': self.id,
+            'room_id': self.room_id,
+            'seconds': self.seconds,
+            'started_at': self.started_at,
+            'done': self.done,
+            'ticks': self.ticks,
+            'phase_ms': {name: total * 1000 for name, total in self.phase_totals.items()},
+            'avg_tick_ms': (sum(self.phase_totals.values()) / self.ticks * 1000) if self.ticks else 0,
+            'note': 'cProfile stats may include other greenlets that ran while emit yielded to the hub'
+        }
+
+    def top_functions(self, limit=30):
+        """按累计耗时排序的文本报告"""
+        out = io.StringIO()
+        stats = pstats.Stats(self.profile, stream=out)
+        stats.sort_stats('cumulative').print_stats(limit)
+        return out.getvalue()
+
+    def speedscope(self):
+        """导出为 speedscope 的 evented 格式，每帧一个 tick 帧，阶段作为子帧"""
+        events = [{'type': kind, 'frame': frame, 'at': (t - self.origin) * 1000}
+                  for kind, frame, t in self.events]
+        return json.dumps({
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'shared': {'frames': [{'name': 'tick'}] + [{'name': name} for name in PHASES]},
+            'profiles': [{
+                'type': 'evented',
+                'name': f'room {self.room_id} ({self.ticks} ticks)',
+                'unit': 'milliseconds',
+                'startValue': 0,
+                'endValue': events[-1]['at'] if events else 0,
+                'events': events
+            }],
+            'exporter': 'sheji profiler'
+        })
+
+
+class TickProfiler:
+    """在游戏循环中按需开启的采样器"""
+
+    def __init__(self, keep=5):
+        self.keep = keep
+        self.captures = OrderedDict()
+        self.current = None
+
+    def start(self, room_id, seconds):
+        """开始采样，已有采样在进行时返回 None"""
+        if self.current is not None:
+            return None
+        capture = Capture(room_id, seconds)
+        self.current = capture
+        self.captures[capture.id] = capture
+        while len(self.captures) > self.keep:
+            self.captures.popitem(last=False)
+        return capture
+
+    def get(self, capture_id):
+        return self.captures.get(capture_id)
+
+    def begin_tick(self, room_id):
+        capture = self.current
+        if capture is None or capture.room_id != room_id:
+            return
+        capture.events.append(('O', 0, time.perf_counter()))
+        capture.enabled = True
+        capture.profile.enable()
+
+    def end_tick(self, room_id):
+        capture = self.current
+        if capture is None or capture.room_id != room_id:
+            return
+        capture.profile.disable()
+        capture.enabled = False
+        now = time.perf_counter()
+        capture.events.append(('C', 0, now))
+        capture.ticks += 1
+        if now >= capture.deadline:
+            self._finish(capture)
+
+    def phase(self, room_id, name):
+        capture = self.current
+        if capture is None or capture.room_id != room_id:
+            return nullcontext()
+        return self._timed(capture, name)
+
+    @contextmanager
+    def _timed(self, capture, name):
+        frame = PHASES.index(name) + 1
+        start = time.perf_counter()
+        capture.events.append(('O', frame, start))
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            capture.phase_totals[name] += end - start
+            capture.events.append(('C', frame, end))
+
+    @contextmanager
+    def paused(self):
+        """暂停正在记录的 cProfile，用来包住会让出 hub 的阻塞调用"""
+        capture = self.current
+        if capture is None or not capture.enabled:
+            yield
+            return
+        capture.profile.disable()
+        try:
+            yield
+        finally:
+            # 暂停期间采样可能已经到期结束
+            if self.current is capture and capture.enabled:
+                capture.profile.enable()
+
+    def check_deadline(self):
+        """房间没有在跑帧时也要按时结束采样"""
+        capture = self.current
+        if capture is not None and time.perf_counter() >= capture.deadline:
+            self._finish(capture)
+
+    def _finish(self, capture):
+        capture.profile.create_stats()
+        capture.pstats = marshal.dumps(capture.profile.stats)
+        capture.done = True
+        self.current = None
@@ -0,0 +1,89 @@
+import time
+from typing import Dict, Tuple
+
+# 限流与过载保护
+#
+# TokenBucket: 单个令牌桶，按 rate 个/秒补充，最多 burst 个
+# RateLimiter: 按 (socket, 事件类型) 分配令牌桶
+# OverloadGuard: 统计每帧耗时，超出预算时进入过载模式
+
+
+class TokenBucket:
+    """令牌桶"""
+
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate, burst, now=None):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic() if now is None else now
+
+    def consume(self, now=None, cost=1):
+        """尝试取出 cost 个令牌，成功返回 True"""
+        now = time.monotonic() if now is None else now
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return True
+        return False
+
+
+class RateLimiter:
+    """按 socket 和事件类型限流"""
+
+    def __init__(self, limits: Dict[str, Tuple[float, float]]):
+        # limits: 事件名 -> (每秒速率, 突发上限)
+        self.limits = limits
+        self.buckets: Dict[str, Dict[str, TokenBucket]] = {}
+
+    def allow(self, sid, event, now=None):
+        if event not in self.limits:
+            return True
+        buckets = self.buckets.setdefault(sid, {})
+        bucket = buckets.get(event)
+        if bucket is None:
+            rate, burst = self.limits[event]
+            bucket = buckets[event] = TokenBucket(rate, burst, now)
+        return bucket.consume(now)
+
+    def forget(self, sid):
+        """玩家断开后清理其令牌桶"""
+        self.buckets.pop(sid, None)
+
+
+class OverloadGuard:
+    """根据帧耗时判断服务器是否过载
+
+    使用指数滑动平均平滑单个房间每帧的耗时，乘以运行中的房间数得到
+    每帧总负载；总负载超过预算时进入过载模式，降到预算的 recover 比例
+    以下才退出，避免在阈值附近来回切换。
+    """
+
+    def __init__(self, budget=0.016, alpha=0.1, recover=0.75):
+        self.budget = budget
+        self.alpha = alpha
+        self.recover = recover
+        self.avg_tick = 0.0
+        self.active = False
+
+    def record(self, tick_time, rooms=1):
+        """记录一个房间一帧的耗时，rooms 为运行中的房间数，返回当前是否过载"""
+        self.avg_tick += self.alpha * (tick_time - self.avg_tick)
+        load = self.avg_tick * max(1, rooms)
+        if self.active:
+            if load < self.budget * self.recover:
+                self.active = False
+        elif load > self.budget:
+            self.active = True
+        return self.active
+
+    def idle(self):
+        """没有房间运行时调用：不再有帧来更新状态，直接退出过载模式"""
+        self.active = False
+
+    @property
+    def send_interval(self):
+        """每隔多少帧广播一次状态；过载时降为 30 FPS"""
+        return 2 if self.active else 1
@@ -1,14 +1,15 @@
 class Game {
     constructor() {
+        // 分层画布: 背景层只画一次，实体层每帧重画，HUD 层只在分数变化时重画
+        this.backgroundCanvas = document.getElementById('backgroundCanvas');
         this.canvas = document.getElementById('gameCanvas');
-        this.ctx = this.canvas.getContext('2d');
-        this.canvas.width = 1200;
-        this.canvas.height = 800;
-        
-        this.socket = io();
-        this.playerId = null;
-        this.gameState = null;
-        this.images = {};
+        this.hudCanvas = document.getElementById('hudCanvas');
+        [this.backgroundCanvas, this.canvas, this.hudCanvas].forEach(canvas => {
+            canvas.width = 1200;
+            canvas.height = 800;
+        });
+        this.backgroundCtx = this.backgroundCanvas.getContext('2d', { alpha: false });
+        this.rejoinToken = null;  // 房间迁移后用于找回自己的飞船
         
         this.keys = {
             ArrowLeft: false,
@@ -18,51 +19,108 @@ class Game {
             Space: false
         };
         
-        this.setupSocketEvents();
+        // 支持时把解码和绘制移到 Worker，否则在主线程渲染
+        if (Game.useRenderWorker()) {
+            this.startRenderWorker();
+        } else {
+            this.renderer = new Renderer(this.canvas, this.hudCanvas);
+            this.socket = io(window.SOCKET_OPTIONS);
+            this.setupSocketEvents();
+        }
         this.setupControls();
-        this.loadAssets();
+        this.loadBackground();
+    }
+
+    static useRenderWorker() {
+        // 可以用 ?worker=0 关闭 Worker 渲染
+        if (new URLSearchParams(window.location.search).get('worker') === '0') return false;
+        return typeof Worker === 'function' &&
+            typeof OffscreenCanvas === 'function' &&
+            typeof createImageBitmap === 'function' &&
+            typeof HTMLCanvasElement.prototype.transferControlToOffscreen === 'function';
     }
 
-    loadAssets() {
-        const imageFiles = {
-            ship: 'ship.png',
-            alien1: 'guaiwu1.png',
-            alien2: 'guaiwu2.png',
-            alien3: 'guaiwu3.png',
-            bullet: 'xiaozidan.png',
-            explosion: 'baozha.png',
-            powerup1: 'zidan.png',
-            powerup2: 'jiasu.png',
-            powerup3: 'hudun.png'
+    startRenderWorker() {
+        const canvas = this.canvas.transferControlToOffscreen();
+        const hudCanvas = this.hudCanvas.transferControlToOffscreen();
+        this.worker = new Worker('/static/js/render_worker.js');
+        this.worker.postMessage({
+            type: 'init',
+            canvas,
+            hudCanvas,
+            socketOptions: window.SOCKET_OPTIONS
+        }, [canvas, hudCanvas]);
+        
+        this.worker.onmessage = (e) => {
+            const message = e.data;
+            if (message.type === 'gameOver') {
+                this.handleGameOver(message.data, message.playerId);
+            } else if (message.type === 'serverBusy') {
+                this.handleServerBusy(message.data);
+            } else if (message.type === 'matchQueued') {
+                this.handleMatchQueued(message.data);
+            } else if (message.type === 'gameStarted') {
+                this.setStatus('');
+            }
+        };
+    }
+
+    loadBackground() {
+        const background = new Image();
+        background.src = '/static/images/youxibeijing.bmp';
+        background.onload = () => {
+            this.backgroundCtx.drawImage(background, 0, 0, this.backgroundCanvas.width, this.backgroundCanvas.height);
         };
-        
-        Object.entries(imageFiles).forEach(([key, file]) => {
-            const img = new Image();
-            img.src = `/static/images/${file}`;
-            img.onload = () => {
-                this.images[key] = img;
-            };
-        });
     }
 
     setupSocketEvents() {
         this.socket.on('connect', () => {
             console.log('Connected to server');
+            // 房间迁移或断线重连后找回自己的飞船
+            if (this.rejoinToken) {
+                this.socket.emit('rejoinGame', { token: this.rejoinToken });
+            }
+        });
+
+        this.socket.on('rejoinToken', (data) => {
+            this.rejoinToken = data.token;
+        });
+
+        this.socket.on('rejoinFailed', () => {
+            this.rejoinToken = null;
+        });
+
+        // 服务器正在下线，断开后重连到其他 worker
+        this.socket.on('roomMigrating', () => {
+            this.socket.disconnect();
+            setTimeout(() => this.socket.connect(), 1000);
         });
 
         this.socket.on('gameStarted', (data) => {
-            this.playerId = data.playerId;
+            this.renderer.playerId = data.playerId;
             this.gameMode = data.mode;
+            this.setStatus('');
             console.log('Game started:', data);
         });
 
+        // 双人模式排队中
+        this.socket.on('matchQueued', (data) => {
+            this.handleMatchQueued(data);
+        });
+
         this.socket.on('gameState', (state) => {
-            this.gameState = state;
-            this.render();
+            this.renderer.setState(state);
         });
 
         this.socket.on('gameOver', (data) => {
-            this.handleGameOver(data);
+            this.handleGameOver(data, this.renderer.playerId);
+            this.renderer.reset();
+            this.rejoinToken = null;
+        });
+
+        // 服务器过载或满员时拒绝开新局
+        this.socket.on('serverBusy', (data) => {
+            this.handleServerBusy(data);
         });
     }
 
@@ -70,143 +128,89 @@ class Game {
         document.addEventListener('keydown', (e) => {
             if (this.keys.hasOwnProperty(e.code)) {
                 this.keys[e.code] = true;
-                this.sendPlayerMove();
+                this.sendPlayerMove(e.code, true);
             }
             if (e.code === 'Space') {
-                this.socket.emit('playerShoot');
+                this.sendPlayerShoot();
             }
         });
 
         document.addEventListener('keyup', (e) => {
             if (this.keys.hasOwnProperty(e.code)) {
                 this.keys[e.code] = false;
-                this.sendPlayerMove();
+                this.sendPlayerMove(e.code, false);
             }
         });
 
         // 设置游戏模式按钮
         ['endlessMode', 'featureMode', 'twoPlayerMode'].forEach(mode => {
             document.getElementById(mode).addEventListener('click', () => {
-                this.socket.emit('startGame', { mode: mode.replace('Mode', '') });
+                this.startGame(mode.replace('Mode', ''));
             });
         });
     }
 
-    sendPlayerMove() {
-        if (!this.gameState?.ships?.[this.playerId]) return;
-        
-        const ship = this.gameState.ships[this.playerId];
-        let x = ship.x;
-        let y = ship.y;
-        
-        if (this.keys.ArrowLeft) x -= 5;
-        if (this.keys.ArrowRight) x += 5;
-        if (this.keys.ArrowUp) y -= 5;
-        if (this.keys.ArrowDown) y += 5;
-        
-        // 边界检查
-        x = Math.max(0, Math.min(x, this.canvas.width - 50));
-        y = Math.max(0, Math.min(y, this.canvas.height - 50));
-        
-        this.socket.emit('playerMove', { x, y });
+    startGame(mode) {
+        if (this.worker) {
+            this.worker.postMessage({ type: 'startGame', mode });
+        } else {
+            this.socket.emit('startGame', { mode });
+        }
     }
 
-    render() {
-        if (!this.gameState) return;
-        
-        // 清空画布
-        this.ctx.clearRect(0, 0, this.canvas.width, this.canvas.height);
-        
-        // 绘制所有游戏元素
-        this.drawShips();
-        this.drawAliens();
-        this.drawBullets();
-        this.drawPowerUps();
-        this.drawUI();
+    sendPlayerShoot() {
+        if (this.worker) {
+            this.worker.postMessage({ type: 'shoot' });
+        } else {
+            this.socket.emit('playerShoot');
+        }
     }
 
-    drawShips() {
-        const shipImg = this.images.ship;
-        if (!shipImg) return;
+    sendPlayerMove(code, down) {
+        // Worker 模式下只转发按键，位置由 Worker 根据最新状态计算
+        if (this.worker) {
+            this.worker.postMessage({ type: 'key', code, down });
+            return;
+        }
         
-        Object.entries(this.gameState.ships).forEach(([id, ship]) => {
-            this.ctx.drawImage(shipImg, ship.x, ship.y, 50, 50);
-            this.drawHealthBar(ship);
-        });
-    }
-
-    drawAliens() {
-        this.gameState.aliens.forEach(alien => {
-            const alienImg = this.images[`alien${alien.type}`];
-            if (alienImg) {
-                this.ctx.drawImage(alienImg, alien.x, alien.y, 50, 50);
-                this.drawHealthBar(alien);
-            }
-        });
-    }
-
-    drawBullets() {
-        const bulletImg = this.images.bullet;
-        if (!bulletImg) return;
+        const ship = this.renderer.gameState?.ships?.[this.renderer.playerId];
+        if (!ship) return;
         
-        this.gameState.bullets.forEach(bullet => {
-            this.ctx.drawImage(bulletImg, bullet.x, bullet.y, 10, 20);
-        });
+        this.socket.emit('playerMove', nextShipPosition(ship, this.keys, this.canvas.width, this.canvas.height));
     }
 
-    drawPowerUps() {
-        this.gameState.power_ups.forEach(powerup => {
-            const powerupImg = this.images[`powerup${powerup.type}`];
-            if (powerupImg) {
-                this.ctx.drawImage(powerupImg, powerup.x, powerup.y, 30, 30);
-            }
-        });
+    setStatus(text) {
+        document.getElementById('status').textContent = text;
     }
 
-    drawHealthBar(entity) {
-        const width = 50;
-        const height = 5;
-        const x = entity.x;
-        const y = entity.y - 10;
-        
-        // 背景
-        this.ctx.fillStyle = 'red';
-        this.ctx.fillRect(x, y, width, height);
-        
-        // 血量
-        const healthPercent = entity.health / (entity.maxHealth || 3);
-        this.ctx.fillStyle = 'green';
-        this.ctx.fillRect(x, y, width * healthPercent, height);
+    handleMatchQueued(data) {
+        this.setStatus(`Waiting for an opponent... (${data.waiting} in queue)`);
     }
 
-    drawUI() {
-        // 分数
-        this.ctx.fillStyle = 'white';
-        this.ctx.font = '24px Arial';
-        Object.entries(this.gameState.scores).forEach(([id, score], index) => {
-            const text = id === this.playerId ? `Your Score: ${score}` : `Player ${index + 1}: ${score}`;
-            this.ctx.fillText(text, 10, 30 + index * 30);
-        });
+    handleServerBusy(data) {
+        // 满员时服务器可能给出其他服务器的地址
+        if (data?.redirect) {
+            window.location.href = data.redirect;
+            return;
+        }
+        this.setStatus('');
+        alert('Server is busy, please try again later.');
     }
 
-    handleGameOver(data) {
-        const isWinner = data.winner === this.playerId;
+    handleGameOver(data, playerId) {
+        const isWinner = data.winner === playerId;
         
         // 显示游戏结束对话框
         const message = isWinner ? 'You Win!' : 'Game Over';
         const scoreText = Object.entries(data.scores)
-            .map(([id, score]) => `${id === this.playerId ? 'You' : 'Player'}: ${score}`)
+            .map(([id, score]) => `${id === playerId ? 'You' : 'Player'}: ${score}`)
             .join('\n');
             
         alert(`${message}\n\n${scoreText}`);
-        
-        // 重置游戏状态
-        this.gameState = null;
-        this.playerId = null;
     }
 }
 
 // 初始化游戏
 window.onload = () => {
     const game = new Game();
-};
\ No newline at end of file
+};
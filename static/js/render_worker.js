@@ -0,0 +1,89 @@
+// 渲染 Worker: 在 Worker 中接收和解码 gameState 并绘制到 OffscreenCanvas，
+// 主线程只负责收集键盘输入并转发过来
+importScripts(
+    'https://cdnjs.cloudflare.com/ajax/libs/socket.io/4.0.1/socket.io.js',
+    '/static/js/renderer.js'
+);
+
+let socket = null;
+let renderer = null;
+let rejoinToken = null;
+const keys = {};
+
+function sendPlayerMove() {
+    const ship = renderer.gameState?.ships?.[renderer.playerId];
+    if (!ship) return;
+
+    socket.emit('playerMove', nextShipPosition(ship, keys, renderer.canvas.width, renderer.canvas.height));
+}
+
+function setupSocket(options) {
+    socket = io(options);
+
+    socket.on('connect', () => {
+        console.log('Connected to server (render worker)');
+        // 房间迁移或断线重连后找回自己的飞船
+        if (rejoinToken) {
+            socket.emit('rejoinGame', { token: rejoinToken });
+        }
+    });
+
+    socket.on('rejoinToken', (data) => {
+        rejoinToken = data.token;
+    });
+
+    socket.on('rejoinFailed', () => {
+        rejoinToken = null;
+    });
+
+    // 服务器正在下线，断开后重连到其他 worker
+    socket.on('roomMigrating', () => {
+        socket.disconnect();
+        setTimeout(() => socket.connect(), 1000);
+    });
+
+    socket.on('gameStarted', (data) => {
+        renderer.playerId = data.playerId;
+        self.postMessage({ type: 'gameStarted' });
+        console.log('Game started:', data);
+    });
+
+    socket.on('matchQueued', (data) => {
+        self.postMessage({ type: 'matchQueued', data });
+    });
+
+    socket.on('gameState', (state) => {
+        renderer.setState(state);
+    });
+
+    // 对话框只能在主线程显示
+    socket.on('gameOver', (data) => {
+        self.postMessage({ type: 'gameOver', data, playerId: renderer.playerId });
+        renderer.reset();
+        rejoinToken = null;
+    });
+
+    socket.on('serverBusy', (data) => {
+        self.postMessage({ type: 'serverBusy', data });
+    });
+}
+
+self.onmessage = (e) => {
+    const message = e.data;
+    switch (message.type) {
+        case 'init':
+            renderer = new Renderer(message.canvas, message.hudCanvas);
+            setupSocket(message.socketOptions);
+            break;
+        case 'key':
+            keys[message.code] = message.down;
+            sendPlayerMove();
+            break;
+        case 'shoot':
+            socket.emit('playerShoot');
+            break;
+        case 'startGame':
+            socket.emit('startGame', { mode: message.mode });
+            break;
+    }
+};
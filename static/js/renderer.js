@@ -0,0 +1,215 @@
+// 渲染器: 主线程和 Web Worker (OffscreenCanvas) 共用
+
+// 每种精灵的绘制尺寸，加载时按此尺寸预缩放
+const SPRITE_SIZES = {
+    ship: [50, 50],
+    alien1: [50, 50],
+    alien2: [50, 50],
+    alien3: [50, 50],
+    bullet: [10, 20],
+    explosion: [50, 50],
+    powerup1: [30, 30],
+    powerup2: [30, 30],
+    powerup3: [30, 30]
+};
+
+const IMAGE_FILES = {
+    ship: 'ship.png',
+    alien1: 'guaiwu1.png',
+    alien2: 'guaiwu2.png',
+    alien3: 'guaiwu3.png',
+    bullet: 'xiaozidan.png',
+    explosion: 'baozha.png',
+    powerup1: 'zidan.png',
+    powerup2: 'jiasu.png',
+    powerup3: 'hudun.png'
+};
+
+// 根据按键计算飞船的下一个位置
+function nextShipPosition(ship, keys, width, height) {
+    let x = ship.x;
+    let y = ship.y;
+
+    if (keys.ArrowLeft) x -= 5;
+    if (keys.ArrowRight) x += 5;
+    if (keys.ArrowUp) y -= 5;
+    if (keys.ArrowDown) y += 5;
+
+    // 边界检查
+    x = Math.max(0, Math.min(x, width - 50));
+    y = Math.max(0, Math.min(y, height - 50));
+    return { x, y };
+}
+
+// 实体层每帧重画，HUD 层只在分数变化时重画
+class Renderer {
+    constructor(canvas, hudCanvas) {
+        this.canvas = canvas;
+        this.hudCanvas = hudCanvas;
+        this.ctx = canvas.getContext('2d');
+        this.hudCtx = hudCanvas.getContext('2d');
+
+        this.playerId = null;
+        this.gameState = null;
+        this.images = {};
+        this.hudKey = null;  // 上次绘制 HUD 时的分数，用于判断是否需要重画
+        this.framePending = false;
+
+        this.loadAssets();
+    }
+
+    loadAssets() {
+        Object.entries(IMAGE_FILES).forEach(([key, file]) => {
+            loadSprite(`/static/images/${file}`, ...SPRITE_SIZES[key]).then(sprite => {
+                this.images[key] = sprite;
+            });
+        });
+    }
+
+    setState(state) {
+        this.gameState = state;
+        this.scheduleRender();
+    }
+
+    reset() {
+        this.gameState = null;
+        this.playerId = null;
+        this.hudKey = null;
+    }
+
+    scheduleRender() {
+        // 每个显示帧最多绘制一次，多个 gameState 只画最新的
+        if (this.framePending) return;
+        this.framePending = true;
+        const frame = typeof requestAnimationFrame === 'function'
+            ? requestAnimationFrame
+            : (callback) => setTimeout(callback, 16);
+        frame(() => {
+            this.framePending = false;
+            this.render();
+        });
+    }
+
+    render() {
+        if (!this.gameState) return;
+
+        // 只清空实体层，背景层保持不变
+        this.ctx.clearRect(0, 0, this.canvas.width, this.canvas.height);
+
+        // 绘制所有游戏元素，血条收集起来最后统一绘制
+        const healthBars = [];
+        this.drawShips(healthBars);
+        this.drawAliens(healthBars);
+        this.drawBullets();
+        this.drawPowerUps();
+        this.drawHealthBars(healthBars);
+        this.drawUI();
+    }
+
+    drawSprite(key, x, y) {
+        // 返回是否已绘制（图片可能还没加载完）
+        const img = this.images[key];
+        if (!img) return false;
+        // 精灵已预缩放，按原尺寸绘制不会触发缩放；取整坐标避免亚像素插值
+        const [width, height] = SPRITE_SIZES[key];
+        this.ctx.drawImage(img, Math.round(x), Math.round(y), width, height);
+        return true;
+    }
+
+    drawShips(healthBars) {
+        Object.values(this.gameState.ships).forEach(ship => {
+            if (this.drawSprite('ship', ship.x, ship.y)) {
+                healthBars.push(ship);
+            }
+        });
+    }
+
+    drawAliens(healthBars) {
+        this.gameState.aliens.forEach(alien => {
+            if (this.drawSprite(`alien${alien.type}`, alien.x, alien.y)) {
+                healthBars.push(alien);
+            }
+        });
+    }
+
+    drawBullets() {
+        this.gameState.bullets.forEach(bullet => {
+            this.drawSprite('bullet', bullet.x, bullet.y);
+        });
+    }
+
+    drawPowerUps() {
+        this.gameState.power_ups.forEach(powerup => {
+            this.drawSprite(`powerup${powerup.type}`, powerup.x, powerup.y);
+        });
+    }
+
+    drawHealthBars(entities) {
+        // 所有血条合并成两条路径，每帧只需两次 fill
+        const width = 50;
+        const height = 5;
+
+        // 背景
+        this.ctx.beginPath();
+        entities.forEach(entity => {
+            this.ctx.rect(Math.round(entity.x), Math.round(entity.y) - 10, width, height);
+        });
+        this.ctx.fillStyle = 'red';
+        this.ctx.fill();
+
+        // 血量
+        this.ctx.beginPath();
+        entities.forEach(entity => {
+            const healthPercent = Math.max(0, entity.health / (entity.maxHealth || 3));
+            this.ctx.rect(Math.round(entity.x), Math.round(entity.y) - 10, width * healthPercent, height);
+        });
+        this.ctx.fillStyle = 'green';
+        this.ctx.fill();
+    }
+
+    drawUI() {
+        // 分数没有变化时不重画 HUD 层
+        const hudKey = JSON.stringify([this.playerId, this.gameState.scores]);
+        if (hudKey === this.hudKey) return;
+        this.hudKey = hudKey;
+
+        this.hudCtx.clearRect(0, 0, this.hudCanvas.width, this.hudCanvas.height);
+        this.hudCtx.fillStyle = 'white';
+        this.hudCtx.font = '24px Arial';
+        Object.entries(this.gameState.scores).forEach(([id, score], index) => {
+            const text = id === this.playerId ? `Your Score: ${score}` : `Player ${index + 1}: ${score}`;
+            this.hudCtx.fillText(text, 10, 30 + index * 30);
+        });
+    }
+}
+
+// 加载图片并预先缩放成绘制尺寸，避免每帧 drawImage 时缩放
+function loadSprite(url, width, height) {
+    const options = { resizeWidth: width, resizeHeight: height, resizeQuality: 'high' };
+
+    // Worker 中没有 Image，只能通过 fetch + createImageBitmap 解码
+    if (typeof Image === 'undefined') {
+        return fetch(url)
+            .then(response => response.blob())
+            .then(blob => createImageBitmap(blob, options));
+    }
+
+    return new Promise((resolve, reject) => {
+        const img = new Image();
+        img.onload = () => resolve(img);
+        img.onerror = reject;
+        img.src = url;
+    }).then(img => {
+        // 没有 createImageBitmap 或缩放失败时，退回到画到同尺寸的 canvas 上
+        if (typeof createImageBitmap !== 'function') return scaleToCanvas(img, width, height);
+        return createImageBitmap(img, options).catch(() => scaleToCanvas(img, width, height));
+    });
+}
+
+function scaleToCanvas(img, width, height) {
+    const canvas = document.createElement('canvas');
+    canvas.width = width;
+    canvas.height = height;
+    canvas.getContext('2d').drawImage(img, 0, 0, width, height);
+    return canvas;
+}
@@ -0,0 +1,97 @@
+import random
+
+import pytest
+
+from checkpoint import (CheckpointError, FLAG_ACTIVE, FLAG_MIGRATING, FileCheckpointStore,
+                        decode_checkpoint, encode_checkpoint, read_header)
+
+
+class State:
+    """与 app.GameState 字段相同的最小状态，避免导入 app 启动后台任务"""
+
+    def __init__(self):
+        self.rng = random.Random()
+        self.reset()
+
+    def reset(self):
+        self.ships = {}
+        self.aliens = []
+        self.bullets = []
+        self.power_ups = []
+        self.scores = {}
+        self.game_active = False
+        self.game_mode = None
+        self.tick = 0
+        self.rejoin_tokens = {}
+
+
+def make_state():
+    state = State()
+    state.rng.seed(42)
+    state.game_mode = 'twoPlayer'
+    state.game_active = True
+    state.tick = 1234
+    state.ships = {
+        'p1': {'x': 100.0, 'y': 700.0, 'health': 3, 'power_ups': {'shield': 2.5}},
+        'p2': {'x': 900.5, 'y': 650.25, 'health': 1, 'power_ups': {}}
+    }
+    state.scores = {'p1': 300, 'p2': 2000}
+    state.aliens = [{'x': 10.0, 'y': -50.0, 'health': 4, 'type': 2}]
+    state.bullets = [{'x': 120.0, 'y': 400.0, 'player_id': 'p2'}]
+    state.power_ups = [{'x': 50.0, 'y': 60.0, 'type': 1}]
+    state.rejoin_tokens = {'tok1': 'p1', 'tok2': 'p2'}
+    return state
+
+
+def test_round_trip():
+    state = make_state()
+    restored = State()
+    assert decode_checkpoint(encode_checkpoint('room1', state), restored) == 'room1'
+    for field in ('ships', 'scores', 'aliens', 'bullets', 'power_ups',
+                  'rejoin_tokens', 'game_mode', 'game_active', 'tick'):
+        assert getattr(restored, field) == getattr(state, field)
+
+
+def test_rng_continues_from_checkpoint():
+    state = make_state()
+    state.rng.gauss(0, 1)  # 留下缓存的 gauss_next
+    restored = State()
+    decode_checkpoint(encode_checkpoint('room1', state), restored)
+    assert [restored.rng.random() for _ in range(5)] == [state.rng.random() for _ in range(5)]
+    assert restored.rng.gauss(0, 1) == state.rng.gauss(0, 1)
+
+
+def test_header_flags():
+    state = make_state()
+    flags, tick, _ = read_header(encode_checkpoint('room1', state, migrating=True))
+    assert flags == FLAG_ACTIVE | FLAG_MIGRATING
+    assert tick == 1234
+
+
+def test_corrupted_checkpoint_is_rejected():
+    data = bytearray(encode_checkpoint('room1', make_state()))
+    data[40] ^= 0xFF
+    with pytest.raises(CheckpointError, match='checksum'):
+        decode_checkpoint(bytes(data), State())
+
+
+@pytest.mark.parametrize('length', [0, 10, 30, 100])
+def test_truncated_checkpoint_is_rejected(length):
+    data = encode_checkpoint('room1', make_state())[:length]
+    with pytest.raises(CheckpointError):
+        decode_checkpoint(data, State())
+
+
+def test_not_a_checkpoint():
+    with pytest.raises(CheckpointError, match='not a checkpoint'):
+        read_header(b'x' * 64)
+
+
+def test_file_store_take_is_exclusive(tmp_path):
+    store = FileCheckpointStore(str(tmp_path))
+    store.save('room1', b'data')
+    assert store.list() == ['room1']
+    assert store.load('room1') == b'data'
+    assert store.take('room1') == b'data'
+    assert store.take('room1') is None
+    assert store.list() == []
@@ -0,0 +1,35 @@
+from leaderboard import LeaderboardStore
+
+
+def make_store(tmp_path, **kwargs):
+    return LeaderboardStore(str(tmp_path / 'leaderboard.db'), **kwargs)
+
+
+def test_writer_persists_submitted_results(tmp_path):
+    store = make_store(tmp_path)
+    store.start()
+    store.submit('m1', 'endless', {'a': 100, 'b': 300}, 'b')
+    assert store.stop()
+    assert [(r['player_id'], r['score']) for r in store.top(10)] == [('b', 300), ('a', 100)]
+
+
+def test_bad_row_does_not_poison_batch_or_kill_writer(tmp_path):
+    store = make_store(tmp_path)
+    store.submit('m1', 'endless', {'a': 1})
+    store.submit('m2', {'bad': 1}, {'b': 2})  # sqlite 不支持 dict
+    store.submit('m3', 'endless', {'c': 3})
+    store.start()
+    store.submit('m4', 'endless', {'d': 4})
+    assert store.stop()
+    assert store.failed == 1
+    assert sorted(r['match_id'] for r in store.top(10)) == ['m1', 'm3', 'm4']
+
+
+def test_restart_after_stop(tmp_path):
+    store = make_store(tmp_path)
+    store.start()
+    assert store.stop()
+    store.start()
+    store.submit('m1', 'endless', {'a': 1})
+    assert store.stop()
+    assert store.count() == 1
@@ -0,0 +1,64 @@
+from matchmaking import Matchmaker
+
+
+def test_pairs_in_queue_order():
+    m = Matchmaker()
+    for player_id in 'abcd':
+        m.enqueue(player_id)
+    assert m.pop_match() == ['a', 'b']
+    assert m.pop_match() == ['c', 'd']
+    assert m.pop_match() is None
+
+
+def test_removed_player_is_skipped():
+    m = Matchmaker()
+    for player_id in 'abc':
+        m.enqueue(player_id)
+    m.remove('a')
+    assert 'a' not in m
+    assert m.pop_match() == ['b', 'c']
+
+
+def test_requeued_player_goes_to_the_back():
+    m = Matchmaker()
+    m.enqueue('a')
+    m.enqueue('b')
+    m.remove('a')
+    m.enqueue('c')
+    m.enqueue('a')
+    assert m.pop_match() == ['b', 'c']
+    assert m.waiting == 1
+
+
+def test_enqueue_twice_keeps_one_entry():
+    m = Matchmaker()
+    m.enqueue('a')
+    m.enqueue('a')
+    m.enqueue('b')
+    assert m.pop_match() == ['a', 'b']
+    assert m.waiting == 0
+
+
+def test_queue_is_compacted():
+    m = Matchmaker()
+    m.enqueue('a')
+    for _ in range(1000):
+        m.remove('b')
+        m.enqueue('b')
+    assert len(m._queue) <= 2 * m.waiting
+    assert m.clear() == ['a', 'b']
+    assert m.waiting == 0
+
+
+def test_full_queue_rejects():
+    m = Matchmaker(max_waiting=2)
+    assert m.enqueue('a') and m.enqueue('b')
+    assert m.full
+    assert not m.enqueue('c')
+
+
+def test_capacity_from_tick_time():
+    m = Matchmaker(max_rooms=50, budget=0.016, utilization=0.75)
+    assert m.capacity(0) == 50
+    assert m.capacity(0.004) == 3
+    assert m.capacity(1.0) == 1
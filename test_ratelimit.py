@@ -0,0 +1,50 @@
+from ratelimit import OverloadGuard, RateLimiter, TokenBucket
+
+
+def test_bucket_burst_then_refill():
+    bucket = TokenBucket(rate=10, burst=3, now=0)
+    assert [bucket.consume(now=0) for _ in range(4)] == [True, True, True, False]
+    assert not bucket.consume(now=0.05)
+    assert bucket.consume(now=0.1)
+
+
+def test_bucket_refill_is_capped_at_burst():
+    bucket = TokenBucket(rate=10, burst=2, now=0)
+    bucket.consume(now=0)
+    bucket.consume(now=0)
+    assert sum(bucket.consume(now=100) for _ in range(5)) == 2
+
+
+def test_rate_limiter_is_per_socket_and_event():
+    limiter = RateLimiter({'startGame': (1, 1)})
+    assert limiter.allow('s1', 'startGame', now=0)
+    assert not limiter.allow('s1', 'startGame', now=0)
+    assert limiter.allow('s2', 'startGame', now=0)
+    assert limiter.allow('s1', 'other', now=0)
+    limiter.forget('s1')
+    assert limiter.allow('s1', 'startGame', now=0)
+
+
+def test_overload_hysteresis():
+    guard = OverloadGuard(budget=0.016, alpha=1.0, recover=0.75)
+    assert not guard.record(0.010)
+    assert guard.record(0.017)
+    assert guard.send_interval == 2
+    # 低于预算但高于恢复线时保持过载
+    assert guard.record(0.014)
+    assert not guard.record(0.011)
+    assert guard.send_interval == 1
+
+
+def test_overload_scales_with_rooms():
+    guard = OverloadGuard(budget=0.016, alpha=1.0)
+    assert not guard.record(0.005, rooms=3)
+    assert guard.record(0.005, rooms=4)
+
+
+def test_idle_clears_overload():
+    guard = OverloadGuard(budget=0.016, alpha=1.0)
+    guard.record(0.1)
+    guard.idle()
+    assert not guard.active
+    assert guard.send_interval == 1
@@ -0,0 +1,38 @@
+from urllib.parse import parse_qs
+
+# Socket.IO 传输层控制
+#
+# python-engineio 4.2 没有限制传输方式的参数，这里用一个 WSGI 中间件
+# 在 Socket.IO 请求到达 engineio 之前拦截：
+#   - 拒绝未启用的传输方式（例如只允许 websocket 时拒绝长轮询）
+#   - 关闭 websocket 的 permessage-deflate：eventlet 会与浏览器协商该扩展并
+#     压缩所有帧，去掉握手中的扩展头即可让每帧的小数据包不再压缩
+
+
+class TransportGuard:
+    """包装 WSGI 应用，按配置过滤 Socket.IO 传输"""
+
+    def __init__(self, wsgi_app, transports, websocket_deflate=True, path='socket.io'):
+        self.wsgi_app = wsgi_app
+        self.transports = set(transports)
+        self.websocket_deflate = websocket_deflate
+        self.path = '/' + path.strip('/') + '/'
+
+    def __call__(self, environ, start_response):
+        if environ.get('PATH_INFO', '').startswith(self.path):
+            query = parse_qs(environ.get('QUERY_STRING', ''))
+            transport = query.get('transport', ['polling'])[0]
+            if transport not in self.transports:
+                start_response('400 BAD REQUEST', [('Content-Type', 'text/plain')])
+                return [f'transport {transport} is disabled'.encode()]
+            if transport == 'websocket' and not self.websocket_deflate:
+                environ.pop('HTTP_SEC_WEBSOCKET_EXTENSIONS', None)
+        return self.wsgi_app(environ, start_response)
+
+
+def client_options(transports):
+    """传给浏览器端 io() 的连接参数"""
+    return {
+        'transports': list(transports),
+        'upgrade': 'websocket' in transports and 'polling' in transports
+    }